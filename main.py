@@ -1,20 +1,186 @@
-from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel
-from typing import Optional, List, Literal
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from pydantic import BaseModel, PrivateAttr, TypeAdapter
+from typing import Optional, List, Tuple, Union
 from uuid import UUID, uuid4
 from datetime import datetime
+from enum import Enum, IntEnum
+from contextlib import contextmanager
+from functools import lru_cache
+from collections import Counter, defaultdict
+from bisect import bisect_left, bisect_right, insort
+from itertools import count, islice
+from operator import attrgetter
+import heapq
+import threading
 
 app = FastAPI()
 
-# 🧠 Banco de dados em memória
-banco_projetos = {}
+# 🔒 Trava de leitura/escrita: leitores concorrentes, escritor exclusivo
+class TravaLeituraEscrita:
+    def __init__(self):
+        self._condicao = threading.Condition(threading.Lock())
+        self._leitores = 0
+        self._escrevendo = False
+        self._escritores_aguardando = 0
+
+    @contextmanager
+    def leitura(self):
+        with self._condicao:
+            # Escritores em espera têm prioridade para não morrerem de fome
+            while self._escrevendo or self._escritores_aguardando:
+                self._condicao.wait()
+            self._leitores += 1
+        try:
+            yield
+        finally:
+            with self._condicao:
+                self._leitores -= 1
+                if not self._leitores:
+                    self._condicao.notify_all()
+
+    @contextmanager
+    def escrita(self):
+        with self._condicao:
+            self._escritores_aguardando += 1
+            while self._escrevendo or self._leitores:
+                self._condicao.wait()
+            self._escritores_aguardando -= 1
+            self._escrevendo = True
+        try:
+            yield
+        finally:
+            with self._condicao:
+                self._escrevendo = False
+                self._condicao.notify_all()
+
+# 🧠 Banco de dados em memória, particionado em fragmentos com trava própria
+NUM_FRAGMENTOS = 16  # potência de 2, para indexar com máscara
+
+def remover_ordenado(chaves, chave):
+    del chaves[bisect_left(chaves, chave)]
+
+class Fragmento:
+    def __init__(self):
+        self.trava = TravaLeituraEscrita()
+        # Chaves são o UUID como int: o hash de int é feito em C, o de UUID
+        # passa por UUID.__hash__ em Python
+        self.projetos = {}
+        # Chaves (criado_em, id) de todos os projetos, em ordem
+        self.ordem = []
+        # Índices secundários: valor do campo -> chaves (criado_em, id) em ordem
+        self.por_status = defaultdict(list)
+        self.por_prioridade = defaultdict(list)
+        self.contagens = Counter()  # (status, prioridade) -> quantidade
+
+    # Os métodos abaixo esperam que a trava do fragmento já esteja segura
+    def guardar(self, projeto):
+        id_int = projeto.id.int
+        anterior = self.projetos.get(id_int)
+        self.projetos[id_int] = projeto
+        chave = (projeto.criado_em, id_int)
+        if anterior is None:
+            insort(self.ordem, chave)
+        else:
+            self.contagens[anterior.status, anterior.prioridade] -= 1
+        self.contagens[projeto.status, projeto.prioridade] += 1
+        if anterior is None or anterior.status != projeto.status:
+            if anterior is not None:
+                remover_ordenado(self.por_status[anterior.status], chave)
+            insort(self.por_status[projeto.status], chave)
+        if anterior is None or anterior.prioridade != projeto.prioridade:
+            if anterior is not None:
+                remover_ordenado(self.por_prioridade[anterior.prioridade], chave)
+            insort(self.por_prioridade[projeto.prioridade], chave)
+
+    def remover(self, id_int):
+        projeto = self.projetos.pop(id_int, None)
+        if projeto is not None:
+            chave = (projeto.criado_em, id_int)
+            self.contagens[projeto.status, projeto.prioridade] -= 1
+            remover_ordenado(self.ordem, chave)
+            remover_ordenado(self.por_status[projeto.status], chave)
+            remover_ordenado(self.por_prioridade[projeto.prioridade], chave)
+        return projeto
+
+    def contar(self, status, prioridade):
+        if status is None and prioridade is None:
+            return len(self.projetos)
+        if status is None:
+            return len(self.por_prioridade.get(prioridade, ()))
+        if prioridade is None:
+            return len(self.por_status.get(status, ()))
+        return self.contagens[status, prioridade]
+
+    def filtrar(self, status, prioridade, limite, apos=None):
+        # Devolve no máximo `limite` projetos depois da chave `apos`: nenhuma
+        # página global precisa de mais do que isso vindo de um só fragmento
+        if status is not None and prioridade is not None:
+            # Percorre o menor índice e confere o outro campo no próprio projeto
+            por_status = self.por_status.get(status, ())
+            por_prioridade = self.por_prioridade.get(prioridade, ())
+            if len(por_status) <= len(por_prioridade):
+                candidatos = self._projetos_apos(por_status, apos)
+                return list(islice((p for p in candidatos if p.prioridade == prioridade), limite))
+            candidatos = self._projetos_apos(por_prioridade, apos)
+            return list(islice((p for p in candidatos if p.status == status), limite))
+        if status is not None:
+            chaves = self.por_status.get(status, ())
+        elif prioridade is not None:
+            chaves = self.por_prioridade.get(prioridade, ())
+        else:
+            chaves = self.ordem
+        return list(islice(self._projetos_apos(chaves, apos), limite))
+
+    def _projetos_apos(self, chaves, apos):
+        # O cursor é localizado por busca binária, sem percorrer as chaves
+        # que vêm antes dele
+        inicio = 0 if apos is None else bisect_right(chaves, apos)
+        return (self.projetos[chaves[j][1]] for j in range(inicio, len(chaves)))
+
+fragmentos = [Fragmento() for _ in range(NUM_FRAGMENTOS)]
+
+def fragmento_de(id_int: int) -> Fragmento:
+    return fragmentos[id_int & (NUM_FRAGMENTOS - 1)]
+
+# 🏷️ Versão do banco: muda depois de cada escrita e invalida o cache da listagem
+versao_banco = 0
+trava_versao = threading.Lock()
+
+def registrar_escrita():
+    global versao_banco
+    with trava_versao:
+        versao_banco += 1
+
+# Cada projeto gravado recebe uma revisão única, usada como ETag
+revisoes = count(1)
+# Os contadores recomeçam a cada processo; o prefixo impede que uma ETag
+# de um processo anterior confira com o estado de outro
+inicio_processo = uuid4().hex
+
+def etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    # Comparação fraca: W/"x" e "x" representam a mesma etiqueta
+    etiquetas = {valor.strip().removeprefix("W/") for valor in if_none_match.split(",")}
+    return "*" in etiquetas or etag.removeprefix("W/") in etiquetas
 
 # 📦 Modelos Pydantic
+class StatusProjeto(str, Enum):
+    PLANEJADO = "Planejado"
+    EM_ANDAMENTO = "Em Andamento"
+    CONCLUIDO = "Concluído"
+    CANCELADO = "Cancelado"
+
+class PrioridadeProjeto(IntEnum):
+    P1 = 1
+    P2 = 2
+    P3 = 3
+
 class ProjetoBase(BaseModel):
     titulo: str
     descricao: Optional[str] = None
-    prioridade: Literal[1, 2, 3]
-    status: Literal["Planejado", "Em Andamento", "Concluído", "Cancelado"]
+    prioridade: PrioridadeProjeto
+    status: StatusProjeto
 
 class ProjetoCriacao(ProjetoBase):
     pass
@@ -22,55 +188,135 @@ class ProjetoCriacao(ProjetoBase):
 class ProjetoResposta(ProjetoBase):
     id: UUID
     criado_em: datetime
+    _revisao: int = PrivateAttr(default=0)
+
+    @property
+    def etag(self) -> str:
+        return f'W/"{inicio_processo}-{self._revisao}"'
 
 class ProjetoAtualizacao(ProjetoBase):
     pass
 
+# Projetos já validados são serializados direto para JSON pelo pydantic-core
+adaptador_lista_projetos = TypeAdapter(Tuple[ProjetoResposta, ...])
+
+def resposta_json(conteudo: Union[bytes, str], status_code: int = 200, etag: Optional[str] = None) -> Response:
+    headers = {"ETag": etag} if etag else None
+    return Response(content=conteudo, status_code=status_code, headers=headers, media_type="application/json")
+
 # ✅ Criar novo projeto
 @app.post("/projetos", response_model=ProjetoResposta, status_code=201)
 def criar_projeto(projeto: ProjetoCriacao):
     id_novo = uuid4()
     criado_em = datetime.now()
-    novo_projeto = ProjetoResposta(id=id_novo, criado_em=criado_em, **projeto.dict())
-    banco_projetos[id_novo] = novo_projeto
-    return novo_projeto
+    # Os campos já foram validados em ProjetoCriacao; não validamos de novo
+    novo_projeto = ProjetoResposta.model_construct(id=id_novo, criado_em=criado_em, **projeto.__dict__)
+    novo_projeto._revisao = next(revisoes)
+    fragmento = fragmento_de(id_novo.int)
+    with fragmento.trava.escrita():
+        fragmento.guardar(novo_projeto)
+    registrar_escrita()
+    return resposta_json(novo_projeto.model_dump_json(), status_code=201, etag=novo_projeto.etag)
 
 # 📃 Listar projetos com filtro e paginação
+# Mesma ordem das chaves (criado_em, id) guardadas nos fragmentos
+por_criacao = attrgetter("criado_em", "id")
+
+# Cursor opaco para paginação por chave: "<criado_em>~<id em hex>"
+def codificar_cursor(projeto: ProjetoResposta) -> str:
+    return f"{projeto.criado_em.isoformat()}~{projeto.id.hex}"
+
+def decodificar_cursor(cursor: str):
+    try:
+        texto_criado_em, id_hex = cursor.split("~")
+        criado_em, id_int = datetime.fromisoformat(texto_criado_em), int(id_hex, 16)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Cursor inválido.") from None
+    # criado_em é sempre ingênuo; um horário com fuso não é comparável às chaves
+    if criado_em.tzinfo is not None:
+        raise HTTPException(status_code=422, detail="Cursor inválido.")
+    return criado_em, id_int
+
+@lru_cache(maxsize=256)
+def listar_em_cache(status, prioridade, skip, limit, apos, versao):
+    # `versao` só faz parte da chave: depois de uma escrita as entradas
+    # antigas não são mais consultadas e saem do LRU com o tempo
+    copias = []
+    total = 0
+    # Cada fragmento devolve seus projetos em ordem de criação; a trava é
+    # segurada só durante o filtro e o merge reconstrói a ordem global
+    for fragmento in fragmentos:
+        with fragmento.trava.leitura():
+            quantidade = fragmento.contar(status, prioridade)
+            if quantidade:
+                total += quantidade
+                copias.append(fragmento.filtrar(status, prioridade, skip + limit, apos))
+    pagina = tuple(islice(heapq.merge(*copias, key=por_criacao), skip, skip + limit))
+    # Guarda o JSON já serializado: um acerto no cache não passa pelo pydantic
+    proximo_cursor = codificar_cursor(pagina[-1]) if len(pagina) == limit else None
+    return adaptador_lista_projetos.dump_json(pagina), total, proximo_cursor
+
 @app.get("/projetos", response_model=List[ProjetoResposta])
 def listar_projetos(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, gt=0, le=100),
-    status: Optional[Literal["Planejado", "Em Andamento", "Concluído", "Cancelado"]] = None,
-    prioridade: Optional[Literal[1, 2, 3]] = None
+    status: Optional[StatusProjeto] = None,
+    prioridade: Optional[PrioridadeProjeto] = None,
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
 ):
-    lista = list(banco_projetos.values())
-    if status:
-        lista = [p for p in lista if p.status == status]
-    if prioridade:
-        lista = [p for p in lista if p.prioridade == prioridade]
-    return lista[skip : skip + limit]
+    apos = None if cursor is None else decodificar_cursor(cursor)
+    versao = versao_banco
+    etag = f'W/"{inicio_processo}-{versao}"'
+    if etag_confere(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    conteudo, total, proximo_cursor = listar_em_cache(status, prioridade, skip, limit, apos, versao)
+    resposta = resposta_json(conteudo, etag=etag)
+    resposta.headers["X-Total-Count"] = str(total)
+    if proximo_cursor is not None:
+        resposta.headers["X-Next-Cursor"] = proximo_cursor
+    return resposta
 
 # 🔍 Detalhar um projeto
 @app.get("/projetos/{projeto_id}", response_model=ProjetoResposta)
-def obter_projeto(projeto_id: UUID):
-    projeto = banco_projetos.get(projeto_id)
-    if not projeto:
+def obter_projeto(projeto_id: UUID, if_none_match: Optional[str] = Header(None)):
+    id_int = projeto_id.int
+    fragmento = fragmento_de(id_int)
+    with fragmento.trava.leitura():
+        projeto = fragmento.projetos.get(id_int)
+    if projeto is None:
         raise HTTPException(status_code=404, detail="Projeto não encontrado.")
-    return projeto
+    if etag_confere(if_none_match, projeto.etag):
+        return Response(status_code=304, headers={"ETag": projeto.etag})
+    return resposta_json(projeto.model_dump_json(), etag=projeto.etag)
 
 # ✏️ Atualizar projeto
 @app.put("/projetos/{projeto_id}", response_model=ProjetoResposta)
 def atualizar_projeto(projeto_id: UUID, dados: ProjetoAtualizacao):
-    projeto_existente = banco_projetos.get(projeto_id)
-    if not projeto_existente:
+    id_int = projeto_id.int
+    fragmento = fragmento_de(id_int)
+    with fragmento.trava.leitura():
+        projeto_existente = fragmento.projetos.get(id_int)
+    if projeto_existente is None:
         raise HTTPException(status_code=404, detail="Projeto não encontrado.")
-    projeto_atualizado = projeto_existente.copy(update=dados.dict())
-    banco_projetos[projeto_id] = projeto_atualizado
-    return projeto_atualizado
+    # id e criado_em nunca mudam, então a cópia é montada fora da trava de
+    # escrita, que fica só com a troca no dicionário e nos índices
+    projeto_atualizado = projeto_existente.model_copy(update=dados.__dict__)
+    projeto_atualizado._revisao = next(revisoes)
+    with fragmento.trava.escrita():
+        # Pode ter sido removido enquanto a cópia era montada
+        if id_int not in fragmento.projetos:
+            raise HTTPException(status_code=404, detail="Projeto não encontrado.")
+        fragmento.guardar(projeto_atualizado)
+    registrar_escrita()
+    return resposta_json(projeto_atualizado.model_dump_json(), etag=projeto_atualizado.etag)
 
 # ❌ Deletar projeto
 @app.delete("/projetos/{projeto_id}", status_code=204)
 def deletar_projeto(projeto_id: UUID):
-    if projeto_id not in banco_projetos:
-        raise HTTPException(status_code=404, detail="Projeto não encontrado.")
-    del banco_projetos[projeto_id]
+    id_int = projeto_id.int
+    fragmento = fragmento_de(id_int)
+    with fragmento.trava.escrita():
+        if fragmento.remover(id_int) is None:
+            raise HTTPException(status_code=404, detail="Projeto não encontrado.")
+    registrar_escrita()
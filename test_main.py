@@ -0,0 +1,53 @@
+from fastapi.testclient import TestClient
+
+from main import app
+
+client = TestClient(app)
+
+
+def criar(titulo):
+    resposta = client.post("/projetos", json={"titulo": titulo, "prioridade": 1, "status": "Planejado"})
+    assert resposta.status_code == 201
+    return resposta.json()["id"]
+
+
+def test_cursor_percorre_todas_as_paginas():
+    for i in range(5):
+        criar(f"Projeto {i}")
+    esperado = [p["id"] for p in client.get("/projetos", params={"limit": 100}).json()]
+
+    vistos, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        resposta = client.get("/projetos", params=params)
+        assert resposta.status_code == 200
+        vistos += [p["id"] for p in resposta.json()]
+        cursor = resposta.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert vistos == esperado
+
+
+def test_cursor_malformado_retorna_422():
+    for cursor in ["lixo", "2024-01-01T00:00:00~zz", "a~b~c"]:
+        assert client.get("/projetos", params={"cursor": cursor}).status_code == 422
+
+
+def test_cursor_com_fuso_horario_retorna_422():
+    resposta = client.get("/projetos", params={"cursor": "2024-01-01T00:00:00+00:00~ab"})
+    assert resposta.status_code == 422
+
+
+def test_etag_inclui_token_do_processo():
+    import main
+
+    projeto_id = criar("Projeto com ETag")
+    etag_projeto = client.get(f"/projetos/{projeto_id}").headers["ETag"]
+    etag_lista = client.get("/projetos").headers["ETag"]
+    assert etag_projeto.startswith(f'W/"{main.inicio_processo}-')
+    assert etag_lista == f'W/"{main.inicio_processo}-{main.versao_banco}"'
+    assert client.get("/projetos", headers={"If-None-Match": etag_lista}).status_code == 304
+    # Uma ETag só com o contador (ex.: de outro processo) não confere
+    assert client.get("/projetos", headers={"If-None-Match": f'W/"{main.versao_banco}"'}).status_code == 200